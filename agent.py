@@ -1,12 +1,78 @@
+import io
 import os
+import logging
 import re
 import string
-from huggingface_hub import InferenceClient
+import asyncio
+import hashlib
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import httpx
+from huggingface_hub import AsyncInferenceClient
+import cache as answer_cache
+from ratelimit import TokenBucket, RECOVERABLE_STATUS, backoff_delay, parse_retry_after
 try:
     from groq import Groq
     GROQ_AVAILABLE = True
 except ImportError:
     GROQ_AVAILABLE = False
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+# pandas' Rust-backed Excel engine, detected without importing it
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+# Answer returned (not raised) when every LLM backend failed
+ERROR_ANSWER = "Error generating answer"
+
+# Fixed reasoning-trace steps, shared by every question
+STEP_SEARCH_NEEDED = "✓ Determined web search is needed"
+STEP_FILE_NEEDED = "✓ Determined file reading is needed"
+STEP_SEARCH_DONE = "✓ Search completed"
+STEP_FILE_DONE = "✓ File processing completed"
+STEP_FILE_MISSING = "⚠ File could not be retrieved - answering without file context"
+STEP_FILE_UNAVAILABLE = "⚠ File unavailable - will attempt to answer without it"
+STEP_EXCEL_PARSED = "✓ Excel file processed successfully"
+STEP_CSV_PARSED = "✓ CSV file processed successfully"
+STEP_TEXT_PARSED = "✓ File processed as text"
+
+logger = logging.getLogger(__name__)
+
+# Client-side request pacing, shared by every agent in the process
+_HF_BUCKET = TokenBucket.from_env("HF_RPS", 1.5)
+_GROQ_BUCKET = TokenBucket.from_env("GROQ_RPS", 5)
+# Groq quotas are also counted in tokens per minute (disabled unless set)
+_GROQ_TOKEN_BUCKET = TokenBucket.per_minute_from_env("GROQ_TPM")
+
+_pd = None
+
+
+def _pandas():
+    """Import pandas on first use; most questions have no file to parse"""
+    global _pd
+    if _pd is None:
+        import pandas
+        _pd = pandas
+    return _pd
+
+
+# Rough characters-per-token ratio used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=4)
+def _load_tokenizer(model_name, token):
+    """Load a model's tokenizer once, or None if transformers can't provide it"""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name, token=token)
+    except Exception as e:
+        logger.info("[INFO] Tokenizer unavailable, estimating context size by length (%s)", e)
+        return None
 
 
 class GAIAAgent:
@@ -15,6 +81,67 @@ class GAIAAgent:
     using Hugging Face Inference API and various tools
     """
     
+    # Keywords that strongly suggest current/factual info needed
+    SEARCH_KEYWORDS = [
+        "current", "latest", "recent", "today", "now", "2024", "2025", "2026",
+        "who is", "what is", "when did", "where is", "how many", "where were",
+        "population", "price", "cost", "president", "CEO", "capital",
+        "located", "founded", "born", "died", "released", "published",
+        "paper", "study", "research", "article", "journal", "publication",
+        "described by", "deposited", "specimens", "author", "cited"
+    ]
+    
+    # Keywords that suggest the question refers to an attached file
+    FILE_KEYWORDS = [
+        "file", "image", "document", "picture", "photo", "shown",
+        "attached", "provided", "given", "painting", "chart",
+        "graph", "table", "spreadsheet", "pdf"
+    ]
+    
+    # One lower-case alternation per keyword list, so each check is a single
+    # regex scan over the already lower-cased question
+    _SEARCH_RE = re.compile("|".join(map(re.escape, map(str.lower, SEARCH_KEYWORDS))))
+    _FILE_RE = re.compile("|".join(map(re.escape, map(str.lower, FILE_KEYWORDS))))
+    
+    # Official GAIA system prompt
+    _SYSTEM_INSTRUCTION = """You are a general AI assistant. I will ask you a question. Report your thoughts, and finish your answer with the following template: FINAL ANSWER: [YOUR FINAL ANSWER]. YOUR FINAL ANSWER should be a number OR as few words as possible OR a comma separated list of numbers and/or strings. If you are asked for a number, don't use comma to write your number neither use units such as $ or percent sign unless specified otherwise. If you are asked for a string, don't use articles, neither abbreviations (e.g. for cities), and write the digits in plain text unless specified otherwise. If you are asked for a comma separated list, apply the above rules depending of whether the element to be put in the list is a number or a string."""
+    _SYSTEM_MESSAGE = {"role": "system", "content": _SYSTEM_INSTRUCTION}
+    
+    # User prompt templates, with and without gathered tool context
+    _PROMPT_WITH_CONTEXT = """Here is some information that may help answer the question:
+
+{context}
+
+Question: {question}
+
+Remember: End your response with "FINAL ANSWER: [YOUR ANSWER]" following the formatting rules."""
+    _PROMPT_NO_CONTEXT = """Question: {question}
+
+Remember: End your response with "FINAL ANSWER: [YOUR ANSWER]" following the formatting rules."""
+    
+    # A first line with a short comma-terminated field looks like CSV
+    _CSV_HEAD_RE = re.compile(rb"^[^,\n]{1,80},")
+    
+    # Words dropped from generated search queries, and the punctuation
+    # trimmed from each query term
+    _STOP_WORDS = frozenset({
+        'the', 'a', 'an', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+        'by', 'from', 'just', 'give', 'me', 'without'
+    })
+    _QUERY_PUNCT = ".,?!"
+    
+    # Wrapper phrases and matching quotes stripped from final answers
+    _PREFIX_RE = re.compile(
+        r"^(?:the answer is|it is|that would be|i believe|i think|this is)\s+",
+        re.IGNORECASE
+    )
+    _QUOTE_RE = re.compile(r"^(['\"])(.*)\1$", re.DOTALL)
+    
+    # Sentinel that ends the model's reasoning, and how many streamed
+    # chunks to keep reading after it before giving up on a newline
+    _FINAL_ANSWER = "FINAL ANSWER:"
+    _ANSWER_TAIL_TOKENS = 80
+    
     def __init__(self, tools=None):
         """
         Initialize the agent with Hugging Face Inference API
@@ -58,15 +185,18 @@ If you're running locally:
 """
             raise ValueError(error_msg)
         
-        # Initialize HF Inference Client
-        self.client = InferenceClient(token=self.api_token)
+        # HF Inference clients are async and bound to the event loop that
+        # uses them, so one is opened per batch (see _answer_batch)
+        self.inference_timeout = 60
+        # Retries for transient HF failures (429/5xx/timeouts) before falling back
+        self.max_retries = 4
         
         # Initialize Groq Client
         self.groq_api_key = os.environ.get("GROQ_API_KEY")
         self.groq_client = None
         if self.groq_api_key and GROQ_AVAILABLE:
             self.groq_client = Groq(api_key=self.groq_api_key)
-            print("[INFO] Groq Client initialized (fallback enabled)")
+            logger.info("[INFO] Groq Client initialized (fallback enabled)")
         
         # Model selection
         # Available models (tested and working):
@@ -79,7 +209,25 @@ If you're running locally:
         
         self.tools = tools or {}
         
-        print(f"[INFO] GAIA Agent initialized with HF Inference API ({self.model_name})")
+        # Maximum number of questions answered concurrently in a batch
+        self.max_concurrency = 8
+        
+        # Tool context beyond this many tokens is cut before prompting
+        self.max_context_tokens = 6000
+        
+        # Worker threads for per-question context gathering, plus a shared
+        # pool so each question's web search and file download run side by side
+        self._prepare_pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self._io_pool = ThreadPoolExecutor(max_workers=2 * self.max_concurrency)
+        
+        # Persistent answer cache keyed by prompt hash (survives restarts)
+        self._cache = None
+        if DISKCACHE_AVAILABLE:
+            cache_dir = os.path.join(answer_cache.cache_dir(), "llm")
+            self._cache = diskcache.Cache(cache_dir)
+            logger.info("[INFO] Answer cache enabled (%s)", cache_dir)
+        
+        logger.info("[INFO] GAIA Agent initialized with HF Inference API (%s)", self.model_name)
     
     def answer_question(self, question_text, task_id=None, file_name=None):
         """
@@ -93,79 +241,196 @@ If you're running locally:
         Returns:
             tuple: (answer, reasoning_trace)
         """
-        print(f"\n{'='*60}")
-        print(f"[PROCESSING] Question: {question_text[:100]}...")
-        print(f"{'='*60}")
+        result = self.answer_questions([(question_text, task_id, file_name)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def answer_questions(self, batch, on_result=None):
+        """
+        Answer several GAIA questions concurrently
+        
+        Each question runs its own pipeline (tool lookups, then the LLM
+        call), with up to self.max_concurrency pipelines in flight, so one
+        question's network waits overlap with the others'. Questions with
+        identical text and file name are answered once and share the result.
+        
+        Args:
+            batch: List of (question_text, task_id, file_name) tuples
+            on_result: Optional callback, called as on_result(index, result)
+                as soon as each question finishes, in completion order
+            
+        Returns:
+            list: One (answer, reasoning_trace) tuple per question, in input
+                order. A question that failed holds the raised exception instead.
+                Once one question raises RuntimeError (HF credits depleted with
+                no Groq fallback), every question not yet started fails with it
+                too, without calling any tool or LLM.
+        """
+        logger.info("  🤖 Answering %d question(s) with HF Inference API...", len(batch))
+        self._start_prefetch(batch)
+        return asyncio.run(self._answer_batch(batch, on_result))
+    
+    def _start_prefetch(self, batch):
+        """
+        Start downloading, in the background, every file the batch will read
+        
+        Questions wait on the semaphore before their own pipeline starts, so
+        this lets later questions' downloads overlap earlier LLM calls.
+        """
+        prefetch = getattr(self.tools.get("file_reader"), "prefetch", None)
+        if prefetch is None:
+            return
+        
+        items = [
+            (task_id, file_name) for question_text, task_id, file_name in batch
+            if task_id and self._needs_file(question_text.lower())
+        ]
+        if len(items) > 1:
+            threading.Thread(target=prefetch, args=(items,), daemon=True).start()
+    
+    async def _answer_batch(self, batch, on_result=None):
+        """
+        Run one answer pipeline per question, bounded by a semaphore
+        
+        Returns:
+            list: (answer, reasoning_trace) tuples or exceptions, in input order
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+        
+        # One client for the whole batch: since huggingface_hub 1.0 it keeps a
+        # single httpx connection pool, so concurrent requests reuse connections
+        # instead of each paying a fresh TLS handshake
+        client = AsyncInferenceClient(token=self.api_token, timeout=self.inference_timeout)
+        
+        # Set once HF credits run out with no fallback; later pipelines stop
+        # before spending a search, download or LLM call on a doomed question
+        depleted = asyncio.Event()
+        depleted_message = []
+        
+        async def answer(question_text, task_id, file_name):
+            async with semaphore:
+                if depleted.is_set():
+                    raise RuntimeError(depleted_message[0])
+                
+                # Tools are blocking, so gather context on a worker thread
+                context, reasoning_steps = await loop.run_in_executor(
+                    self._prepare_pool, self._prepare_question, question_text, task_id, file_name
+                )
+                
+                if depleted.is_set():
+                    raise RuntimeError(depleted_message[0])
+                
+                # Step 3: Generate answer using GAIA format
+                try:
+                    answer, answer_reasoning = await self._generate_answer_gaia_format(
+                        client, question_text, context
+                    )
+                except RuntimeError as e:
+                    if not depleted.is_set():
+                        depleted_message.append(str(e))
+                        depleted.set()
+                    raise
+            
+            self._step(reasoning_steps, answer_reasoning)
+            
+            # Step 4: Format answer for scorer
+            final_answer = self._format_for_scorer(answer, question_text)
+            self._step(reasoning_steps, f"Final formatted answer: {final_answer}")
+            
+            logger.info("  [ANSWER] %s", final_answer)
+            
+            # Combine reasoning trace
+            return final_answer, " | ".join(reasoning_steps)
         
-        reasoning_steps = []
-        reasoning_steps.append(f"Question: {question_text}")
+        # Identical questions (same text and file) share one pipeline
+        inflight = {}
+        
+        async def run(index, item):
+            question_text, task_id, file_name = item
+            key = (question_text, file_name)
+            if key not in inflight:
+                inflight[key] = asyncio.ensure_future(answer(*item))
+            else:
+                logger.debug("  ♻ Task %s duplicates an earlier question, reusing its answer", task_id)
+            try:
+                result = await inflight[key]
+            except Exception as e:
+                result = e
+            if on_result:
+                # A failing callback (e.g. a locked cache database) must not
+                # cancel the rest of the batch or discard answers already paid for
+                try:
+                    on_result(index, result)
+                except Exception as e:
+                    logger.error("  [ERROR] Result callback failed for task %s: %s", task_id, e)
+            return result
+        
+        try:
+            return await asyncio.gather(*[run(i, item) for i, item in enumerate(batch)])
+        finally:
+            close = getattr(client, "close", None)
+            if close:
+                await close()
+    
+    def _prepare_question(self, question_text, task_id=None, file_name=None):
+        """
+        Decide which tools a question needs and gather their context
+        
+        Returns:
+            tuple: (context, reasoning_steps)
+        """
+        logger.debug("\n%s\n[PROCESSING] Question: %s...\n%s", "=" * 60, question_text[:100], "=" * 60)
+        
+        reasoning_steps = [f"Question: {question_text}"]
         
         # Step 1: Analyze if we need tools
-        needs_search = self._needs_web_search(question_text)
-        needs_file = task_id and self._needs_file(question_text)
+        question_lower = question_text.lower()
+        needs_search = self._needs_web_search(question_lower)
+        needs_file = task_id and self._needs_file(question_lower)
         
         if needs_search:
-            reasoning_steps.append("✓ Determined web search is needed")
-            print("  [SEARCH] Web search required")
+            self._step(reasoning_steps, STEP_SEARCH_NEEDED, "  [SEARCH] Web search required")
         if needs_file:
-            reasoning_steps.append("✓ Determined file reading is needed")
-            print("  [FILE] File reading required")
+            self._step(reasoning_steps, STEP_FILE_NEEDED, "  [FILE] File reading required")
         
-        # Step 2: Gather context
+        # Step 2: Gather context (search and file download are independent,
+        # so start both before waiting on either)
         context = ""
+        search_future = None
+        file_future = None
         
         if needs_search and "search" in self.tools:
-            print("  [SEARCH] Performing web search...")
-            search_query = self._generate_search_query(question_text)
-            reasoning_steps.append(f"Search query: {search_query}")
-            
-            search_results = self.tools["search"].search(search_query, max_results=8)
-            context += f"\n\nWeb Search Results:\n{search_results}\n"
-            reasoning_steps.append("✓ Search completed")
+            logger.debug("  [SEARCH] Performing web search...")
+            search_query = self._generate_search_query(question_text, question_lower)
+            self._step(
+                reasoning_steps, f"Search query: {search_query}",
+                f"      🔍 Search query: {search_query}"
+            )
+            search_future = self._io_pool.submit(
+                self.tools["search"].search, search_query, max_results=8
+            )
         
         if needs_file and "file_reader" in self.tools:
-            print("  [FILE] Reading associated file...")
-            file_content = self.tools["file_reader"].read_file(task_id, file_name)
+            logger.debug("  [FILE] Reading associated file...")
+            file_future = self._io_pool.submit(
+                self.tools["file_reader"].read_file, task_id, file_name
+            )
+        
+        if search_future:
+            search_results = search_future.result()
+            context += f"\n\nWeb Search Results:\n{search_results}\n"
+            self._step(reasoning_steps, STEP_SEARCH_DONE)
+        
+        if file_future:
+            file_content = file_future.result()
             
             # Try to process the file content
             if isinstance(file_content, bytes) and len(file_content) > 0:
-                # Check if it's an error message (JSON response)
-                try:
-                    error_check = file_content.decode('utf-8', errors='ignore')
-                    if 'detail' in error_check or 'Failed to download' in error_check or 'Error' in error_check:
-                        print(f"      [WARN] File download issue: {error_check[:100]}")
-                        context += f"\n\nNote: The associated file could not be downloaded from the API. The agent will attempt to answer based on the question text alone. If the question requires viewing an image or reading a specific file, the answer may be incomplete.\n"
-                        reasoning_steps.append("⚠ File unavailable - will attempt to answer without it")
-                    else:
-                        # Try to process as Excel file first
-                        try:
-                            import pandas as pd
-                            import io
-                            
-                            # Try to read as Excel
-                            df = pd.read_excel(io.BytesIO(file_content))
-                            excel_summary = f"Excel file contents (first 50 rows):\n{df.head(50).to_string()}\n\nColumn names: {list(df.columns)}\nTotal rows: {len(df)}"
-                            context += f"\n\nFile Content:\n{excel_summary}\n"
-                            reasoning_steps.append("✓ Excel file processed successfully")
-                            print(f"      ✓ Excel file processed: {len(df)} rows, {len(df.columns)} columns")
-                        except Exception as excel_error:
-                            # Try as CSV
-                            try:
-                                import pandas as pd
-                                import io
-                                df = pd.read_csv(io.BytesIO(file_content))
-                                csv_summary = f"CSV file contents (first 50 rows):\n{df.head(50).to_string()}\n\nColumn names: {list(df.columns)}\nTotal rows: {len(df)}"
-                                context += f"\n\nFile Content:\n{csv_summary}\n"
-                                reasoning_steps.append("✓ CSV file processed successfully")
-                                print(f"      ✓ CSV file processed: {len(df)} rows, {len(df.columns)} columns")
-                            except:
-                                # Fall back to text interpretation
-                                file_text = file_content.decode('utf-8', errors='ignore')[:2000]
-                                context += f"\n\nFile Content (text interpretation):\n{file_text}\n"
-                                reasoning_steps.append(f"✓ File processed as text")
-                except Exception as e:
-                    context += f"\n\nFile: [Binary file, {len(file_content)} bytes - could not parse]\n"
-                    reasoning_steps.append(f"✓ File downloaded but could not be parsed: {e}")
+                file_context, file_step = self._parse_file(file_content)
+                context += file_context
+                self._step(reasoning_steps, file_step)
             else:
                 # File download failed - add graceful message
                 file_notice = f"\n\nNote: The file associated with this question (task_id: {task_id}"
@@ -173,137 +438,183 @@ If you're running locally:
                     file_notice += f", file_name: {file_name}"
                 file_notice += ") could not be retrieved from the API. The agent will attempt to answer based on the question text alone. If the question specifically requires analyzing an image, spreadsheet, or other file content, the answer may indicate that the file is unavailable.\n"
                 context += file_notice
-                reasoning_steps.append("⚠ File could not be retrieved - answering without file context")
-                print("      ⚠ File unavailable - will attempt to answer without it")
+                self._step(
+                    reasoning_steps, STEP_FILE_MISSING,
+                    "      ⚠ File unavailable - will attempt to answer without it"
+                )
             
-            reasoning_steps.append("✓ File processing completed")
-        
-        # Step 3: Generate answer using GAIA format
-        print("  🤖 Generating answer with HF Inference API...")
-        answer, answer_reasoning = self._generate_answer_gaia_format(
-            question_text, 
-            context
-        )
-        reasoning_steps.append(answer_reasoning)
-        
-        # Step 4: Format answer for scorer
-        final_answer = self._format_for_scorer(answer, question_text)
-        reasoning_steps.append(f"Final formatted answer: {final_answer}")
-        
-        print(f"  [ANSWER] {final_answer}")
-        print(f"{'='*60}\n")
-        
-        # Combine reasoning trace
-        reasoning_trace = " | ".join(reasoning_steps)
-        
-        return final_answer, reasoning_trace
-    
-    def _needs_web_search(self, question):
-        """Determine if question needs web search"""
-        # Keywords that strongly suggest current/factual info needed
-        search_keywords = [
-            "current", "latest", "recent", "today", "now", "2024", "2025", "2026",
-            "who is", "what is", "when did", "where is", "how many", "where were",
-            "population", "price", "cost", "president", "CEO", "capital",
-            "located", "founded", "born", "died", "released", "published",
-            "paper", "study", "research", "article", "journal", "publication",
-            "described by", "deposited", "specimens", "author", "cited"
-        ]
+            self._step(reasoning_steps, STEP_FILE_DONE)
         
-        question_lower = question.lower()
+        return self._truncate_context(context), reasoning_steps
+    
+    def _truncate_context(self, context):
+        """Cut tool context down to self.max_context_tokens tokens"""
+        # Every token covers at least one character, so short context fits
+        if len(context) <= self.max_context_tokens:
+            return context
+        
+        tokenizer = _load_tokenizer(self.model_name, self.api_token)
+        if tokenizer is None:
+            return context[:self.max_context_tokens * _CHARS_PER_TOKEN]
+        
+        token_ids = tokenizer.encode(context, add_special_tokens=False)
+        if len(token_ids) <= self.max_context_tokens:
+            return context
+        
+        logger.debug("      Context truncated from %d to %d tokens", len(token_ids), self.max_context_tokens)
+        return tokenizer.decode(token_ids[:self.max_context_tokens])
+    
+    @staticmethod
+    def _step(reasoning_steps, message, echo=None):
+        """Record a reasoning step, optionally logging a console line with it"""
+        reasoning_steps.append(message)
+        if echo:
+            logger.debug(echo)
+    
+    @staticmethod
+    def _sniff(content):
+        """
+        Classify downloaded file bytes by their leading bytes
         
-        # Check for search keywords
-        return any(keyword in question_lower for keyword in search_keywords)
+        Returns:
+            str: One of "xlsx", "xls", "csv", "text" or "error"
+        """
+        if content.startswith(b"PK\x03\x04"):
+            return "xlsx"
+        if content.startswith(b"\xd0\xcf\x11\xe0"):
+            return "xls"
+        
+        head = content[:200]
+        stripped = head.lstrip()
+        if (stripped.startswith(b"{") and b'"detail"' in stripped) or stripped.startswith(b"Failed to download"):
+            return "error"
+        if GAIAAgent._CSV_HEAD_RE.match(head):
+            return "csv"
+        return "text"
     
-    def _needs_file(self, question):
-        """Determine if question needs file reading"""
-        file_keywords = [
-            "file", "image", "document", "picture", "photo", "shown",
-            "attached", "provided", "given", "painting", "chart",
-            "graph", "table", "spreadsheet", "pdf"
-        ]
+    def _parse_file(self, file_content):
+        """
+        Turn downloaded file bytes into prompt context with a single parser
+        
+        Returns:
+            tuple: (context, reasoning_step)
+        """
+        kind = self._sniff(file_content)
+        parser = {
+            "xlsx": self._parse_excel,
+            "xls": self._parse_excel,
+            "csv": self._parse_csv,
+            "text": self._parse_text,
+            "error": self._parse_error,
+        }[kind]
         
-        question_lower = question.lower()
-        return any(keyword in question_lower for keyword in file_keywords)
+        try:
+            return parser(file_content)
+        except Exception as e:
+            # Misdetected or corrupt file - fall back to text interpretation
+            logger.warning("      [WARN] Could not parse file as %s: %s", kind, e)
+            return self._parse_text(file_content)
+    
+    def _parse_excel(self, file_content):
+        """Summarize an Excel workbook's first sheet"""
+        df = _pandas().read_excel(io.BytesIO(file_content), engine=EXCEL_ENGINE)
+        excel_summary = f"Excel file contents (first 50 rows):\n{df.head(50).to_string()}\n\nColumn names: {list(df.columns)}\nTotal rows: {len(df)}"
+        logger.debug("      ✓ Excel file processed: %d rows, %d columns", len(df), len(df.columns))
+        return f"\n\nFile Content:\n{excel_summary}\n", STEP_EXCEL_PARSED
     
-    def _generate_search_query(self, question):
+    def _parse_csv(self, file_content):
+        """Summarize a CSV file"""
+        df = _pandas().read_csv(io.BytesIO(file_content))
+        csv_summary = f"CSV file contents (first 50 rows):\n{df.head(50).to_string()}\n\nColumn names: {list(df.columns)}\nTotal rows: {len(df)}"
+        logger.debug("      ✓ CSV file processed: %d rows, %d columns", len(df), len(df.columns))
+        return f"\n\nFile Content:\n{csv_summary}\n", STEP_CSV_PARSED
+    
+    def _parse_text(self, file_content):
+        """Interpret the start of a file as UTF-8 text"""
+        file_text = file_content[:2000].decode('utf-8', errors='ignore')
+        return f"\n\nFile Content (text interpretation):\n{file_text}\n", STEP_TEXT_PARSED
+    
+    def _parse_error(self, file_content):
+        """Report an API error body returned in place of the file"""
+        logger.warning("      [WARN] File download issue: %s", file_content[:100].decode('utf-8', errors='ignore'))
+        return (
+            "\n\nNote: The associated file could not be downloaded from the API. The agent will attempt to answer based on the question text alone. If the question requires viewing an image or reading a specific file, the answer may be incomplete.\n",
+            STEP_FILE_UNAVAILABLE
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _needs_web_search(question_lower):
+        """Determine if question needs web search (expects a lower-cased question)"""
+        return bool(GAIAAgent._SEARCH_RE.search(question_lower))
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _needs_file(question_lower):
+        """Determine if question needs file reading (expects a lower-cased question)"""
+        return bool(GAIAAgent._FILE_RE.search(question_lower))
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _generate_search_query(question, question_lower):
         """Generate an effective search query from the question"""
-        # Extract key terms from the question for search
-        # Remove common question words and focus on content
-        stop_words = {'the', 'a', 'an', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'just', 'give', 'me', 'without'}
-        words = question.split()
-        
-        # Keep important words (capitalized names, numbers, key terms)
-        key_terms = []
-        for word in words:
-            clean_word = word.strip('.,?!').lower()
-            # Keep if: capitalized (proper noun), number, or not a stop word
-            if word[0].isupper() or clean_word.isdigit() or clean_word not in stop_words:
-                key_terms.append(word.strip('.,?!'))
+        # Keep important words: capitalized names, numbers, and non-stop words
+        # (lower() keeps whitespace, so both splits line up word for word)
+        stop_words = GAIAAgent._STOP_WORDS
+        punct = GAIAAgent._QUERY_PUNCT
+        key_terms = [
+            clean_word for word, word_lower in zip(question.split(), question_lower.split())
+            if (clean_word := word.strip(punct))
+            and (word[0].isupper() or clean_word.isdigit() or word_lower.strip(punct) not in stop_words)
+        ]
         
         # Use first 12 key terms for search query
-        query = " ".join(key_terms[:12])
-        print(f"      🔍 Search query: {query}")
-        return query
+        return " ".join(key_terms[:12])
     
-    def _generate_answer_gaia_format(self, question, context=""):
+    async def _generate_answer_gaia_format(self, client, question, context=""):
         """
         Generate answer using official GAIA system prompt format
         """
-        # Official GAIA system prompt
-        system_instruction = """You are a general AI assistant. I will ask you a question. Report your thoughts, and finish your answer with the following template: FINAL ANSWER: [YOUR FINAL ANSWER]. YOUR FINAL ANSWER should be a number OR as few words as possible OR a comma separated list of numbers and/or strings. If you are asked for a number, don't use comma to write your number neither use units such as $ or percent sign unless specified otherwise. If you are asked for a string, don't use articles, neither abbreviations (e.g. for cities), and write the digits in plain text unless specified otherwise. If you are asked for a comma separated list, apply the above rules depending of whether the element to be put in the list is a number or a string."""
+        system_instruction = self._SYSTEM_INSTRUCTION
+        template = self._PROMPT_WITH_CONTEXT if context else self._PROMPT_NO_CONTEXT
+        user_prompt = template.format(context=context, question=question)
         
-        # Construct the prompt
-        if context:
-            user_prompt = f"""Here is some information that may help answer the question:
-
-{context}
-
-Question: {question}
-
-Remember: End your response with "FINAL ANSWER: [YOUR ANSWER]" following the formatting rules."""
-        else:
-            user_prompt = f"""Question: {question}
-
-Remember: End your response with "FINAL ANSWER: [YOUR ANSWER]" following the formatting rules."""
+        # Identical prompts to the same model get the same answer
+        cache_key = self._llm_cache_key(self.model_name, system_instruction, user_prompt)
+        cached = self._cached_answer(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             # Try HF Inference API first
-            print(f"      Attempting with HF API ({self.model_name})...")
-            response = self.client.chat_completion(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_instruction},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=2000
-            )
-            
-            # Extract response
-            full_response = response.choices[0].message.content
-            
-            # Extract final answer
-            if "FINAL ANSWER:" in full_response:
-                parts = full_response.split("FINAL ANSWER:")
-                answer = parts[-1].strip()
-                reasoning = parts[0].strip()
-            else:
-                answer = full_response.strip()
-                reasoning = "Direct answer provided"
+            logger.debug("      Attempting with HF API (%s)...", self.model_name)
+            full_response = await self._stream_with_retry(client, [
+                self._SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ])
             
-            return answer, reasoning
+            return self._cache_answer(cache_key, full_response)
             
         except Exception as e:
             error_str = str(e)
-            print(f"      [WARN] HF API failed: {error_str}")
+            logger.warning("      [WARN] HF API failed: %s", error_str)
             
             # Check if we should fallback to Groq
             if self.groq_client:
-                print(f"      🔄 Switching to Groq API ({self.groq_model})...")
+                logger.info("      🔄 Switching to Groq API (%s)...", self.groq_model)
+                # Cached under Groq's own key, so it is never served as an HF answer
+                groq_key = self._llm_cache_key(f"groq:{self.groq_model}", system_instruction, user_prompt)
+                cached = self._cached_answer(groq_key)
+                if cached is not None:
+                    return cached
                 try:
-                    return self._generate_answer_groq(system_instruction, user_prompt)
+                    loop = asyncio.get_running_loop()
+                    full_response = await loop.run_in_executor(
+                        None, self._generate_answer_groq, system_instruction, user_prompt
+                    )
+                    return self._cache_answer(groq_key, full_response)
                 except Exception as groq_e:
-                    print(f"      [ERROR] Groq API also failed: {groq_e}")
+                    logger.error("      [ERROR] Groq API also failed: %s", groq_e)
                     # If both fail, re-raise original error or improved one
             
             # Check for credit depletion (402 Payment Required)
@@ -314,10 +625,40 @@ Remember: End your response with "FINAL ANSWER: [YOUR ANSWER]" following the for
                         "OR configure GROQ_API_KEY to use free fallback."
                     )
             
-            return "Error generating answer", error_str
+            return ERROR_ANSWER, error_str
+
+    @staticmethod
+    def _llm_cache_key(model, system_instruction, user_prompt):
+        """Cache key for one model's answer to one prompt"""
+        return hashlib.sha256((model + system_instruction + user_prompt).encode("utf-8")).hexdigest()
+    
+    def _cached_answer(self, key):
+        """Return a previously generated (answer, reasoning) pair, or None"""
+        if self._cache is None:
+            return None
+        cached = self._cache.get(key)
+        if cached is not None:
+            logger.debug("      ✓ Using cached answer")
+        return cached
+    
+    def _cache_answer(self, key, full_response):
+        """
+        Split a model response into (answer, reasoning) and return it
+        
+        Only complete responses are stored: an empty or cut-off reply
+        without a "FINAL ANSWER:" would otherwise be served forever.
+        """
+        result = self._split_final_answer(full_response)
+        if self._cache is not None and self._FINAL_ANSWER in full_response and result[0]:
+            self._cache.set(key, result)
+        return result
 
     def _generate_answer_groq(self, system_instruction, user_prompt):
-        """Generate answer using Groq API as fallback"""
+        """Generate a raw response using Groq API as fallback"""
+        _GROQ_BUCKET.acquire()
+        _GROQ_TOKEN_BUCKET.acquire(
+            (len(system_instruction) + len(user_prompt)) // _CHARS_PER_TOKEN + 2000
+        )
         completion = self.groq_client.chat.completions.create(
             model=self.groq_model,
             messages=[
@@ -331,51 +672,134 @@ Remember: End your response with "FINAL ANSWER: [YOUR ANSWER]" following the for
             stop=None,
         )
         
-        full_response = completion.choices[0].message.content
+        return completion.choices[0].message.content or ""
+    
+    async def _stream_with_retry(self, client, messages):
+        """
+        Call _stream_until_answer, retrying transient failures with backoff
+        
+        Rate limits (honoring Retry-After), 5xx errors, timeouts and
+        connection errors are retried up to self.max_retries times; other
+        errors, including 402 credit depletion, are raised immediately.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._stream_until_answer(client, messages)
+            except Exception as e:
+                status, retry_after = self._http_error_details(e)
+                if status is not None:
+                    retryable = status in RECOVERABLE_STATUS
+                else:
+                    retryable = isinstance(
+                        e, (TimeoutError, asyncio.TimeoutError, OSError, httpx.TransportError)
+                    )
+                if not retryable or attempt == self.max_retries:
+                    raise
+                
+                delay = backoff_delay(attempt, retry_after)
+                logger.warning(
+                    "      [RETRY] HF API failed (%s), retrying in %.1fs (%d/%d)",
+                    status or type(e).__name__, delay, attempt + 1, self.max_retries
+                )
+                await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _http_error_details(error):
+        """
+        Extract the HTTP status and Retry-After seconds from a client error
+        
+        Reads huggingface_hub errors wrapping an httpx response
+        (response.status_code/response.headers), and errors carrying
+        status/headers directly.
+        
+        Returns:
+            tuple: (status or None, retry_after seconds or None)
+        """
+        response = getattr(error, "response", None)
+        status = getattr(error, "status", None) or getattr(response, "status_code", None)
+        headers = getattr(error, "headers", None) or getattr(response, "headers", None) or {}
+        return status, parse_retry_after(headers.get("Retry-After"))
+    
+    async def _stream_until_answer(self, client, messages):
+        """
+        Stream a chat completion and stop once the final answer is complete
+        
+        Decoding stops at the end of the line following "FINAL ANSWER:"
+        (or after _ANSWER_TAIL_TOKENS more chunks), instead of waiting for
+        the model to use up the rest of max_tokens.
+        
+        Returns:
+            str: The generated text received so far
+        """
+        await _HF_BUCKET.acquire_async()
+        stream = await client.chat_completion(
+            model=self.model_name,
+            messages=messages,
+            max_tokens=2000,
+            stream=True
+        )
         
-        # Extract final answer
-        if "FINAL ANSWER:" in full_response:
-            parts = full_response.split("FINAL ANSWER:")
+        text = ""
+        marker_end = -1
+        tail_tokens = 0
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                text += delta
+                
+                if marker_end < 0:
+                    # Only rescan the region the new delta could complete
+                    start = max(0, len(text) - len(delta) - len(self._FINAL_ANSWER))
+                    found = text.find(self._FINAL_ANSWER, start)
+                    if found < 0:
+                        continue
+                    marker_end = found + len(self._FINAL_ANSWER)
+                else:
+                    tail_tokens += 1
+                
+                # The answer ends at the first newline after its first non-blank character
+                tail = text[marker_end:]
+                answer_start = marker_end + len(tail) - len(tail.lstrip())
+                line_end = text.find("\n", answer_start)
+                if line_end >= 0:
+                    text = text[:line_end]
+                    break
+                if tail_tokens >= self._ANSWER_TAIL_TOKENS:
+                    break
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose:
+                await aclose()
+        
+        return text
+    
+    def _split_final_answer(self, full_response):
+        """Split a model response into (answer, reasoning) around FINAL ANSWER:"""
+        if self._FINAL_ANSWER in full_response:
+            parts = full_response.split(self._FINAL_ANSWER)
             answer = parts[-1].strip()
             reasoning = parts[0].strip()
         else:
             answer = full_response.strip()
             reasoning = "Direct answer provided"
-            
+        
         return answer, reasoning
     
     def _format_for_scorer(self, answer, question):
         """
         Format answer to match GAIA scorer expectations
         """
-        answer = answer.strip()
-        
         # Remove common wrapper phrases
-        prefixes_to_remove = [
-            "the answer is ",
-            "it is ",
-            "that would be ",
-            "i believe ",
-            "i think ",
-            "this is ",
-        ]
-        
-        answer_lower = answer.lower()
-        for prefix in prefixes_to_remove:
-            if answer_lower.startswith(prefix):
-                answer = answer[len(prefix):]
-                answer = answer.strip()
-                break
+        answer = self._PREFIX_RE.sub("", answer.strip(), count=1)
         
         # Remove surrounding quotes
-        if (answer.startswith('"') and answer.endswith('"')) or \
-           (answer.startswith("'") and answer.endswith("'")):
-            answer = answer[1:-1]
-        
-        # Remove trailing periods
-        answer = answer.rstrip('.')
-        
-        # Remove extra whitespace
-        answer = ' '.join(answer.split())
+        match = self._QUOTE_RE.match(answer)
+        if match:
+            answer = match.group(2)
         
-        return answer.strip()
\ No newline at end of file
+        # Remove trailing periods and extra whitespace
+        return " ".join(answer.rstrip(".").split())
@@ -8,12 +8,17 @@ This application allows users to:
 - Check configuration status
 """
 import os
+import atexit
 import sys
-import json
+import threading
+import orjson
+import logging
 import warnings
 import gradio as gr
 from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
+import cache as answer_cache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -24,6 +29,13 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', line_buffering=True)
 
+# Agent, tool and API client output goes through logging; set GAIA_VERBOSE=1 for per-step detail
+logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.WARNING)
+for _name in ("agent", "tools", "gaia_client", "cache"):
+    logging.getLogger(_name).setLevel(
+        logging.DEBUG if os.environ.get("GAIA_VERBOSE", "0") == "1" else logging.INFO
+    )
+
 # Suppress Python 3.13 asyncio warnings
 warnings.filterwarnings("ignore", category=RuntimeWarning, module="asyncio")
 if sys.version_info >= (3, 13):
@@ -31,22 +43,42 @@ if sys.version_info >= (3, 13):
     asyncio.set_event_loop_policy(asyncio.DefaultEventLoopPolicy())
 
 
+# Where generate_submission_file writes its JSONL output
+SUBMISSION_FILE = "submission.jsonl"
+
+
 # =============================================================================
 # LAZY INITIALIZATION (for HF Spaces SSR compatibility)
 # =============================================================================
 
+_components_lock = threading.Lock()
+
+
 def get_components():
-    """Lazy initialization of components."""
+    """Lazy initialization of components, built once and reused by every request."""
+    # lru_cache alone would let two concurrent first requests both build
+    with _components_lock:
+        return _build_components()
+
+
+@lru_cache(maxsize=1)
+def _build_components():
+    """Create the tools, GAIA client and agent."""
     from tools import WebSearchTool, FileReaderTool, CalculatorTool
-    from gaia_client import GAIAClient
+    from gaia_client import GAIAClient, create_session
     from agent import GAIAAgent
     
     gaia_api_url = os.environ.get("GAIA_API_URL", "https://placeholder-url.com")
     
+    # One HTTP session for the whole process, so every GAIA API call reuses
+    # pooled keep-alive connections instead of a new TCP+TLS handshake
+    session = create_session()
+    atexit.register(session.close)
+    
     search_tool = WebSearchTool()
-    file_reader_tool = FileReaderTool(gaia_api_url)
+    file_reader_tool = FileReaderTool(gaia_api_url, session=session)
     calculator_tool = CalculatorTool()
-    gaia_client = GAIAClient(gaia_api_url)
+    gaia_client = GAIAClient(gaia_api_url, session=session)
     
     agent = GAIAAgent(tools={
         "search": search_tool,
@@ -61,10 +93,30 @@ def get_components():
 # CORE FUNCTIONS
 # =============================================================================
 
+def lookup_cached_answer(task_id, question_text, file_name=None):
+    """
+    Find a cached answer for a question.
+    
+    Tries the exact (task_id, question, file) key first, then - for
+    questions without an attached file - the semantic cache, if enabled.
+    
+    Returns:
+        tuple: (cache_key, cached) where cached is None on a miss
+    """
+    cache_key = answer_cache.make_key(task_id, question_text, file_name)
+    cached = answer_cache.get(cache_key)
+    if cached is None and not file_name:
+        cached = answer_cache.find_similar(question_text)
+        if cached:
+            print(f"[INFO] Semantic cache hit (similarity {cached['similarity']:.2f})")
+    return cache_key, cached
+
+
 def test_single_question():
     """Test the agent on one random question."""
     try:
         gaia_api_url, gaia_client, agent = get_components()
+        from agent import ERROR_ANSWER
         
         print("\n" + "="*70)
         print(" TESTING AGENT ON RANDOM QUESTION")
@@ -102,7 +154,18 @@ def test_single_question():
         else:
             print()
         
-        answer, reasoning = agent.answer_question(question_text, task_id, file_name)
+        cache_key, cached = lookup_cached_answer(task_id, question_text, file_name)
+        if cached:
+            print("[INFO] Using cached answer")
+            answer, reasoning = cached["answer"], cached["reasoning"]
+        else:
+            answer, reasoning = agent.answer_question(question_text, task_id, file_name)
+            if answer and answer != ERROR_ANSWER:
+                # Answers that relied on an attachment must not match file-less questions
+                answer_cache.put(
+                    cache_key, {"answer": answer, "reasoning": reasoning},
+                    None if file_name else question_text
+                )
         
         print(f"\n[OK] Agent's Answer: {answer}")
         print(f"[REASONING] {reasoning[:200]}...")
@@ -128,117 +191,220 @@ Test completed successfully.
         return error_msg
 
 
+def load_completed_entries(path, failed_answers):
+    """
+    Read the successful entries of an earlier, possibly interrupted, run.
+    
+    Failed answers and a partially written last line are dropped so those
+    questions are answered again.
+    
+    Returns:
+        List of (task_id, raw JSONL line) tuples, in file order
+    """
+    if not os.path.exists(path):
+        return []
+    
+    completed = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+            if entry.get("task_id") and entry.get("model_answer") not in failed_answers:
+                completed.append((entry["task_id"], line))
+    return completed
+
+
 def generate_submission_file():
     """Generate the JSONL submission file for GAIA leaderboard."""
     try:
         gaia_api_url, gaia_client, agent = get_components()
+        from agent import ERROR_ANSWER
         
         print("\n" + "="*70)
         print(" GENERATING SUBMISSION FILE FOR GAIA LEADERBOARD")
         print("="*70 + "\n")
         
-        questions = gaia_client.get_all_questions()
-        
-        if not questions:
-            return f"[ERROR] Failed to get questions. GAIA_API_URL: {gaia_api_url}"
-        
-        print(f"[INFO] Retrieved {len(questions)} questions")
-        print(f"[INFO] Estimated time: {len(questions) * 20} seconds (~{len(questions) * 20 // 60} minutes)\n")
+        # Build the batch while the questions stream in, keeping only the
+        # fields the agent needs rather than every raw question dict
+        batch = []
+        try:
+            for i, q_data in enumerate(gaia_client.iter_questions()):
+                task_id = q_data.get("task_id") or q_data.get("id")
+                question_text = (
+                    q_data.get("Question") or 
+                    q_data.get("question") or 
+                    q_data.get("text") or
+                    q_data.get("query")
+                )
+                
+                if not question_text:
+                    print(f"[WARN] Question {i+1} has no text. Skipping...")
+                    continue
+                
+                batch.append((question_text, task_id, q_data.get("file_name")))
+        except Exception as e:
+            print(f"[ERROR] Error getting questions: {e}")
+            batch = []
+        
+        if not batch:
+            return f"[ERROR] Failed to get questions. GAIA_API_URL: {gaia_api_url}", None
+        
+        print(f"[INFO] Retrieved {len(batch)} questions")
+        print(f"[INFO] Estimated time: {len(batch) * 20} seconds (~{len(batch) * 20 // 60} minutes)\n")
+        
+        # Resume an interrupted run: keep its successful entries (rewritten
+        # atomically without failures or a torn last line) and skip them below
+        completed = load_completed_entries(
+            SUBMISSION_FILE, {"", "Error", "API credits exhausted", ERROR_ANSWER}
+        )
+        done_task_ids = {task_id for task_id, _ in completed}
+        if os.path.exists(SUBMISSION_FILE):
+            tmp_file = SUBMISSION_FILE + ".tmp"
+            with open(tmp_file, "wb") as f:
+                f.writelines(line for _, line in completed)
+            os.replace(tmp_file, SUBMISSION_FILE)
+        if done_task_ids:
+            print(f"[INFO] Resuming: {len(done_task_ids)} questions already answered in {SUBMISSION_FILE}")
         
-        results = []
         successful = 0
         failed = 0
+        samples = []
         
-        for i, q_data in enumerate(questions):
-            task_id = q_data.get("task_id") or q_data.get("id")
-            question_text = (
-                q_data.get("Question") or 
-                q_data.get("question") or 
-                q_data.get("text") or
-                q_data.get("query")
-            )
+        # Each entry is written (and flushed) the moment it is ready, so
+        # the full submission never has to be held in memory
+        with open(SUBMISSION_FILE, "ab") as submission:
             
-            if not question_text:
-                print(f"[WARN] Question {i+1} has no text. Skipping...")
-                continue
+            def record(i, result):
+                """Write one question's submission entry."""
+                nonlocal successful, failed
+                question_text, task_id, file_name = batch[i]
+                
+                print(f"\n{'─'*70}")
+                print(f"[{i+1}/{len(batch)}] Task ID: {task_id}")
+                print(f"Question: {question_text[:100]}...")
+                if file_name:
+                    print(f"File: {file_name}")
+                
+                if isinstance(result, RuntimeError):
+                    # API credit depletion
+                    print(f"\n[CRITICAL] {result}")
+                    entry = {
+                        "task_id": task_id,
+                        "model_answer": "API credits exhausted",
+                        "reasoning_trace": str(result)
+                    }
+                    failed += 1
+                elif isinstance(result, Exception):
+                    print(f"[ERROR] Error processing question: {result}")
+                    entry = {
+                        "task_id": task_id,
+                        "model_answer": "Error",
+                        "reasoning_trace": f"Error: {str(result)}"
+                    }
+                    failed += 1
+                else:
+                    answer, reasoning = result
+                    entry = {
+                        "task_id": task_id,
+                        "model_answer": answer,
+                        "reasoning_trace": reasoning
+                    }
+                    successful += 1
+                    print(f"[OK] Answer: {answer}")
+                
+                submission.write(orjson.dumps(entry))
+                submission.write(b"\n")
+                submission.flush()
+                if len(samples) < 2:
+                    samples.append(entry)
             
-            file_name = q_data.get("file_name")
+            # Reuse answers from earlier runs; only new questions reach the agent
+            cache_keys = []
+            pending = []
+            resumed = 0
+            for i, (question_text, task_id, file_name) in enumerate(batch):
+                if task_id in done_task_ids:
+                    successful += 1
+                    resumed += 1
+                    cache_keys.append(None)
+                    continue
+                cache_key, cached = lookup_cached_answer(task_id, question_text, file_name)
+                cache_keys.append(cache_key)
+                if cached:
+                    record(i, (cached["answer"], cached["reasoning"]))
+                else:
+                    pending.append(i)
+            print(f"[INFO] {len(batch) - len(pending) - resumed} answers loaded from cache, {len(pending)} to generate")
             
-            print(f"\n{'─'*70}")
-            print(f"[{i+1}/{len(questions)}] Task ID: {task_id}")
-            print(f"Question: {question_text[:100]}...")
-            if file_name:
-                print(f"File: {file_name}")
+            # Runs on the agent's event loop, so embedding (slow, CPU-bound)
+            # waits until the batch is done; only the exact-key write happens here
+            to_embed = []
             
-            try:
-                answer, reasoning = agent.answer_question(question_text, task_id, file_name)
-                results.append({
-                    "task_id": task_id,
-                    "model_answer": answer,
-                    "reasoning_trace": reasoning
-                })
-                successful += 1
-                print(f"[OK] Answer: {answer}")
-            except RuntimeError as e:
-                # API credit depletion - stop processing
-                error_msg = str(e)
-                print(f"\\n[CRITICAL] {error_msg}")
-                print(f"[INFO] Stopping early after {i+1} questions due to API credit exhaustion.")
-                results.append({
-                    "task_id": task_id,
-                    "model_answer": "API credits exhausted",
-                    "reasoning_trace": error_msg
-                })
-                failed += 1
-                break  # Stop processing more questions
-            except Exception as e:
-                print(f"[ERROR] Error processing question: {e}")
-                results.append({
-                    "task_id": task_id,
-                    "model_answer": "Error",
-                    "reasoning_trace": f"Error: {str(e)}"
-                })
-                failed += 1
+            def on_result(j, result):
+                i = pending[j]
+                if not isinstance(result, Exception) and result[0] and result[0] != ERROR_ANSWER:
+                    question_text, _, file_name = batch[i]
+                    # A failed cache write only costs a future cache hit; still record the answer
+                    try:
+                        answer_cache.put(cache_keys[i], {"answer": result[0], "reasoning": result[1]})
+                        if not file_name:
+                            to_embed.append((cache_keys[i], question_text))
+                    except Exception as e:
+                        print(f"[WARN] Could not cache answer for task {batch[i][1]}: {e}")
+                record(i, result)
+            
+            # Answer the remaining questions at once so they run concurrently
+            if pending:
+                agent.answer_questions([batch[i] for i in pending], on_result=on_result)
+            
+            for cache_key, question_text in to_embed:
+                try:
+                    answer_cache.add_embedding(cache_key, question_text)
+                except Exception as e:
+                    print(f"[WARN] Could not index question for semantic cache: {e}")
+        
+        total = successful + failed
         
         print(f"\n{'='*70}")
         print(f"[OK] SUBMISSION FILE GENERATED SUCCESSFULLY!")
         print(f"{'='*70}")
         print(f"[STATS] Statistics:")
-        print(f"   Total questions: {len(results)}")
+        print(f"   Total questions: {total}")
         print(f"   Successful: {successful}")
         print(f"   Failed: {failed}")
+        print(f"   Saved to: {SUBMISSION_FILE}")
         print(f"{'='*70}\n")
         
-        # Create JSONL content
-        jsonl_content = "\n".join(json.dumps(r, ensure_ascii=False) for r in results)
+        sample_entries = "\n".join(
+            orjson.dumps(entry, option=orjson.OPT_INDENT_2).decode("utf-8") for entry in samples
+        )
         
         output = f"""=== SUBMISSION FILE GENERATED ===
 
 Statistics:
-- Total: {len(results)}
+- Total: {total}
 - Successful: {successful}
 - Failed: {failed}
-- Success rate: {(successful/len(results)*100):.1f}%
+- Success rate: {(successful/total*100) if total else 0:.1f}%
 
 SAMPLE ENTRIES:
-{json.dumps(results[0], indent=2, ensure_ascii=False) if results else 'N/A'}
-
-=== COPY BELOW AND SAVE AS submission.jsonl ===
+{sample_entries or 'N/A'}
 
-{jsonl_content}
-
-=== END OF FILE ===
+Saved to: {os.path.abspath(SUBMISSION_FILE)}
 
 NEXT STEPS:
-1. Copy the JSONL content above (between the === markers)
-2. Save it as 'submission.jsonl'
-3. Go to: https://huggingface.co/spaces/gaia-benchmark/leaderboard
-4. Upload your file!
+1. Download submission.jsonl from the file box below
+2. Go to: https://huggingface.co/spaces/gaia-benchmark/leaderboard
+3. Upload your file!
 """
-        return output
+        return output, os.path.abspath(SUBMISSION_FILE)
         
     except Exception as e:
-        return f"[ERROR] {str(e)}"
+        return f"[ERROR] {str(e)}", None
 
 
 def check_config():
@@ -319,12 +485,14 @@ with gr.Blocks(title="GAIA Agent - HF Inference API") as demo:
         This will:
         1. Process all questions from the GAIA API
         2. Generate answers using HF Inference API
-        3. Create a `.jsonl` content ready for submission
+        3. Write each answer to `submission.jsonl` as soon as it is ready
         4. Provide reasoning traces for each answer
         
         **Estimated time**: 10-15 minutes for all questions
         
-        **Note**: Copy the JSONL output and save as .jsonl file
+        **Note**: Download the generated .jsonl file when the run finishes.
+        An interrupted run resumes where it stopped; only failed and missing
+        questions are answered again.
         """)
         
         generate_btn = gr.Button(
@@ -333,13 +501,14 @@ with gr.Blocks(title="GAIA Agent - HF Inference API") as demo:
             size="lg"
         )
         summary_output = gr.Textbox(
-            label="Submission Content (copy and save as .jsonl)",
-            lines=30
+            label="Submission Summary",
+            lines=20
         )
+        submission_file = gr.File(label="Submission File (.jsonl)")
         
         generate_btn.click(
             fn=generate_submission_file,
-            outputs=summary_output
+            outputs=[summary_output, submission_file]
         )
     
     with gr.Tab("Submission Info"):
@@ -372,19 +541,18 @@ with gr.Blocks(title="GAIA Agent - HF Inference API") as demo:
         ### How to Submit:
         
         1. **Generate** your submission file using the "Generate Submission" tab
-        2. **Copy** the JSONL content from the output
-        3. **Save** as `submission.jsonl`
-        4. **Go to** [GAIA Leaderboard](https://huggingface.co/spaces/gaia-benchmark/leaderboard)
-        5. **Click** "Submit a new model for evaluation"
-        6. **Fill in** the form:
+        2. **Download** the generated `submission.jsonl`
+        3. **Go to** [GAIA Leaderboard](https://huggingface.co/spaces/gaia-benchmark/leaderboard)
+        4. **Click** "Submit a new model for evaluation"
+        5. **Fill in** the form:
            - Agent name: `[YourName]-HFAgent-v1`
            - Model family: `Llama-3.1-70B / Llama-3.3-70B (Hybrid)`
            - System prompt: Copy from above
            - URL: Your Space URL
            - Organisation: Your name
            - Email: Your email
-        7. **Upload** your `.jsonl` file
-        8. **Submit** and wait for results!
+        6. **Upload** your `.jsonl` file
+        7. **Submit** and wait for results!
         
         ### Scoring:
         Your submission will be evaluated using exact match scoring:
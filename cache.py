@@ -0,0 +1,198 @@
+"""
+Persistent answer cache
+
+Stores every successfully answered GAIA question in a local SQLite
+database, so restarting the app (or re-running a submission) does not
+pay for the same LLM calls twice.
+
+Optionally, near-duplicate questions can also be served from the cache:
+set GAIA_SEMANTIC_CACHE_THRESHOLD (e.g. 0.85) and install
+sentence-transformers to match questions by embedding cosine similarity.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+
+# Small sentence embedding model used for semantic lookups (384 dimensions)
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def cache_dir():
+    """
+    Directory holding all local caches
+
+    Returns:
+        Value of GAIA_CACHE_DIR, or ".gaia_cache" if unset
+    """
+    return os.environ.get("GAIA_CACHE_DIR", ".gaia_cache")
+
+
+def _connection():
+    """Open (once per thread) the answers database, creating it if needed"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(cache_dir(), exist_ok=True)
+        conn = sqlite3.connect(os.path.join(cache_dir(), "answers.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, answer TEXT, reasoning TEXT, ts INTEGER)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def make_key(task_id, question_text, file_name=None):
+    """
+    Build the cache key for a question
+
+    Args:
+        task_id: The ID of the GAIA task
+        question_text: The question text
+        file_name: Optional file name associated with the question
+
+    Returns:
+        Hex digest identifying the question
+    """
+    return hashlib.sha256(f"{task_id}|{question_text}|{file_name}".encode("utf-8")).hexdigest()
+
+
+def get(key):
+    """
+    Look up a cached answer
+
+    Args:
+        key: Key from make_key()
+
+    Returns:
+        Dictionary with "answer" and "reasoning", or None if not cached
+    """
+    row = _connection().execute(
+        "SELECT answer, reasoning FROM answers WHERE key = ?", (key,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"answer": row[0], "reasoning": row[1]}
+
+
+def put(key, value, question_text=None):
+    """
+    Store an answer
+
+    Args:
+        key: Key from make_key()
+        value: Dictionary with "answer" and "reasoning"
+        question_text: Optional question text, embedded for semantic
+            lookups when semantic caching is enabled. Leave it out for
+            questions with an attachment, whose answers depend on the file
+    """
+    conn = _connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO answers (key, answer, reasoning, ts) VALUES (?, ?, ?, ?)",
+        (key, value["answer"], value["reasoning"], int(time.time()))
+    )
+    conn.commit()
+    if question_text:
+        add_embedding(key, question_text)
+
+
+def add_embedding(key, question_text):
+    """
+    Embed a question so semantic lookups can find the answer stored under key
+
+    Loading the model and encoding are slow, so batch runs call this after
+    the answers are in rather than while other requests are in flight.
+    Does nothing unless semantic caching is enabled.
+
+    Args:
+        key: Key from make_key() of an answer already stored with put()
+        question_text: The question text
+    """
+    if not semantic_threshold():
+        return
+    vector = _embed(question_text)
+    if vector is None:
+        return
+    conn = _connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+        (key, vector.tobytes())
+    )
+    conn.commit()
+
+
+def semantic_threshold():
+    """
+    Minimum cosine similarity for a semantic cache hit
+
+    Returns:
+        Value of GAIA_SEMANTIC_CACHE_THRESHOLD, or 0.0 (disabled) if unset
+    """
+    return float(os.environ.get("GAIA_SEMANTIC_CACHE_THRESHOLD", "0") or 0)
+
+
+@lru_cache(maxsize=1)
+def _embedder():
+    """Load the embedding model once, or None if it is unavailable"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL)
+    except Exception as e:
+        logger.warning("[WARN] Semantic cache disabled, could not load %s: %s", EMBEDDING_MODEL, e)
+        return None
+
+
+def _embed(text):
+    """Return the normalized float32 embedding of text, or None"""
+    model = _embedder()
+    if model is None:
+        return None
+    return model.encode(text, normalize_embeddings=True).astype("float32")
+
+
+def find_similar(question_text):
+    """
+    Look up the cached answer to the most similar earlier question
+
+    Args:
+        question_text: The question text
+
+    Returns:
+        Dictionary with "answer", "reasoning" and "similarity", or None if
+        semantic caching is disabled or nothing is similar enough
+    """
+    threshold = semantic_threshold()
+    if not threshold:
+        return None
+
+    rows = _connection().execute("SELECT key, vector FROM embeddings").fetchall()
+    vector = _embed(question_text) if rows else None
+    if vector is None:
+        return None
+
+    import numpy as np
+    keys = [row[0] for row in rows]
+    matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype="float32").reshape(len(rows), -1)
+
+    # Embeddings are normalized, so the dot product is the cosine similarity
+    scores = matrix @ vector
+    best = int(scores.argmax())
+    if scores[best] < threshold:
+        return None
+
+    cached = get(keys[best])
+    if cached:
+        cached["similarity"] = float(scores[best])
+    return cached
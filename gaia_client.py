@@ -1,18 +1,129 @@
+import time
+import logging
+import threading
+import orjson
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from ratelimit import RECOVERABLE_STATUS, backoff_delay, parse_retry_after
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def create_session(pool_connections=10, pool_maxsize=20):
+    """
+    Create a requests.Session with a keep-alive connection pool
+    
+    This stays on HTTP/1.1 rather than an HTTP/2 client such as httpx: the
+    GAIA API serves a handful of small JSON responses and attachments, so a
+    warm pool of pooled connections already avoids the handshake cost that
+    multiplexing would save, without a second HTTP stack to maintain.
+    
+    Args:
+        pool_connections: Number of hosts to keep connection pools for
+        pool_maxsize: Maximum open connections kept per host
+        
+    Returns:
+        requests.Session whose connections are reused across calls
+    """
+    session = requests.Session()
+    # Retries are handled by callers, which know what is safe to repeat
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    # No Accept-Encoding override: requests already advertises every encoding
+    # urllib3 can decode, which includes zstd once zstandard is installed
+    return session
+
+
+def request_with_backoff(session, method, url, max_retries=3, **kwargs):
+    """
+    Send an HTTP request, retrying recoverable failures with backoff
+    
+    Timeouts, connection errors and recoverable statuses (429, 5xx, ...)
+    are retried with jittered exponential backoff, honoring Retry-After.
+    Any other response is returned immediately, since permanent 4xx
+    errors will not succeed on a retry.
+    
+    Args:
+        session: requests.Session to send the request with
+        method: HTTP method, e.g. "GET"
+        url: URL to request
+        max_retries: Maximum number of attempts
+        **kwargs: Passed through to session.request()
+        
+    Returns:
+        The last requests.Response, which may still be an error status
+        
+    Raises:
+        requests.exceptions.RequestException: If the last attempt could not connect
+    """
+    for attempt in range(max_retries):
+        last_attempt = attempt == max_retries - 1
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if last_attempt:
+                raise
+            reason, retry_after = type(e).__name__, None
+        else:
+            if response.status_code not in RECOVERABLE_STATUS or last_attempt:
+                return response
+            reason = f"HTTP {response.status_code}"
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            response.close()
+        
+        delay = backoff_delay(attempt, retry_after)
+        logger.warning("      ⚠️  %s from %s, retrying in %.1fs", reason, url, delay)
+        time.sleep(delay)
+
+
+# Sent with requests whose response is parsed as JSON
+JSON_HEADERS = {"Accept": "application/json"}
 
 
 class GAIAClient:
     """Client for interacting with GAIA benchmark API"""
     
-    def __init__(self, api_url):
+    def __init__(self, api_url, session=None):
         """
         Initialize the GAIA client
         
         Args:
             api_url: Base URL of the GAIA API
+            session: Optional requests.Session to share connections with other tools
         """
         self.api_url = api_url.rstrip('/')  # Remove trailing slash if present
-        print(f"[INIT] GAIA Client initialized with URL: {self.api_url}")
+        self._session = session or create_session()
+        self._etag_cache = {}  # url -> (ETag, Last-Modified, parsed body)
+        logger.debug("[INIT] GAIA Client initialized with URL: %s", self.api_url)
+        
+        # Resolve DNS and finish the TLS handshake in the background, so the
+        # first real request finds a ready connection in the pool
+        threading.Thread(target=self._warm_up, daemon=True).start()
+    
+    def _warm_up(self):
+        """Open a pooled connection to the API with a cheap HEAD request"""
+        try:
+            self._session.head(self.api_url, timeout=5)
+        except requests.exceptions.RequestException as e:
+            logger.debug("[INIT] Connection warm-up failed: %s", e)
+    
+    def close(self):
+        """Close the client's HTTP session and its pooled connections"""
+        self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
     
     def get_all_questions(self):
         """
@@ -22,23 +133,73 @@ class GAIAClient:
             List of question dictionaries
         """
         try:
-            url = f"{self.api_url}/questions"
-            print(f"[API] Fetching questions from: {url}")
-            
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            questions = response.json()
-            print(f"[INFO] Retrieved {len(questions)} questions")
+            questions = list(self.iter_questions())
+            logger.info("[INFO] Retrieved %d questions", len(questions))
             return questions
             
         except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Error getting questions: {e}")
+            logger.error("[ERROR] Error getting questions: %s", e)
             return []
         except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
+            logger.error("[ERROR] Unexpected error: %s", e)
             return []
     
+    def iter_questions(self):
+        """
+        Stream evaluation questions one at a time as the response arrives
+        
+        Uses ijson when installed, so the full JSON payload is never held
+        in memory at once; otherwise falls back to parsing it whole. When
+        the server sends an ETag or Last-Modified, the parsed questions are
+        kept so later calls can send a conditional GET and reuse them on
+        304 Not Modified; without those headers nothing is buffered.
+        
+        Yields:
+            Question dictionaries
+        """
+        url = f"{self.api_url}/questions"
+        logger.debug("[API] Fetching questions from: %s", url)
+        
+        # Revalidate an earlier copy instead of downloading it again
+        headers = dict(JSON_HEADERS)
+        cached = self._etag_cache.get(url)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        
+        with request_with_backoff(
+            self._session, "GET", url, headers=headers, timeout=30, stream=IJSON_AVAILABLE
+        ) as response:
+            if response.status_code == 304 and cached:
+                logger.debug("[API] Questions unchanged (304), using cached copy")
+                yield from cached[2]
+                return
+            
+            response.raise_for_status()
+            
+            # Only keep a copy when the server lets us revalidate it later
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            questions = [] if etag or last_modified else None
+            
+            if IJSON_AVAILABLE:
+                response.raw.decode_content = True  # Let urllib3 undo gzip
+                for question in ijson.items(response.raw, "item", use_float=True):
+                    if questions is not None:
+                        questions.append(question)
+                    yield question
+            else:
+                parsed = orjson.loads(response.content)
+                if questions is not None:
+                    questions = parsed
+                yield from parsed
+            
+            if questions is not None:
+                self._etag_cache[url] = (etag, last_modified, questions)
+    
     def get_random_question(self):
         """
         Get one random question for testing
@@ -48,25 +209,25 @@ class GAIAClient:
         """
         try:
             url = f"{self.api_url}/random-question"
-            print(f"[API] Fetching random question from: {url}")
+            logger.debug("[API] Fetching random question from: %s", url)
             
-            response = requests.get(url, timeout=30)
+            response = request_with_backoff(self._session, "GET", url, headers=JSON_HEADERS, timeout=30)
             response.raise_for_status()
             
-            question = response.json()
-            print(f"[INFO] Retrieved random question")
+            question = orjson.loads(response.content)
+            logger.debug("[INFO] Retrieved random question")
             
             # Debug: Show available fields in response
             if isinstance(question, dict):
-                print(f"   Available fields: {list(question.keys())}")
+                logger.debug("   Available fields: %s", list(question))
             
             return question
             
         except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Error getting random question: {e}")
+            logger.error("[ERROR] Error getting random question: %s", e)
             return None
         except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
+            logger.error("[ERROR] Unexpected error: %s", e)
             return None
     
     def get_file(self, task_id):
@@ -81,53 +242,103 @@ class GAIAClient:
         """
         try:
             url = f"{self.api_url}/files/{task_id}"
-            print(f"[FILE] Downloading file for task {task_id}")
+            logger.debug("[FILE] Downloading file for task %s", task_id)
             
-            response = requests.get(url, timeout=30)
+            response = request_with_backoff(self._session, "GET", url, timeout=30)
             response.raise_for_status()
             
-            print(f"[INFO] File downloaded ({len(response.content)} bytes)")
+            logger.debug("[INFO] File downloaded (%d bytes)", len(response.content))
             return response.content
             
         except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Error getting file: {e}")
+            logger.error("[ERROR] Error getting file: %s", e)
             return None
         except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
+            logger.error("[ERROR] Unexpected error: %s", e)
             return None
     
-    def submit_answers(self, username, code_link, answers):
+    def get_files_bulk(self, task_ids, max_workers=8):
+        """
+        Download the files of several questions concurrently
+        
+        Each download goes through get_file, so it shares the client's
+        pooled session and retry policy.
+        
+        Args:
+            task_ids: Task IDs that have associated files
+            max_workers: Maximum number of simultaneous downloads
+            
+        Returns:
+            List of file contents as bytes (None where a download failed),
+            in the same order as task_ids
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        
+        logger.debug("[FILE] Downloading %d files concurrently", len(task_ids))
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(task_ids))) as executor:
+            return list(executor.map(self.get_file, task_ids))
+    
+    def submit_answers(self, username, code_link, answers, batch_size=None):
         """
         Submit your answers for scoring
         
+        By default all answers go out in one request. With batch_size set,
+        they are split into batches posted concurrently; only use this with
+        a server that accepts partial submissions, since each batch is
+        scored as a submission of its own.
+        
         Args:
             username: Your Hugging Face username
             code_link: URL to your Space code
             answers: List of {"task_id": "...", "submitted_answer": "..."}
+            batch_size: Maximum answers per request (None sends them all at once)
             
         Returns:
-            Result dictionary with score
+            Result dictionary with score. When batched, {"batches": [...]}
+            holding each batch's own result, plus "error" if any batch failed
         """
+        url = f"{self.api_url}/submit"
+        if not batch_size or len(answers) <= batch_size:
+            logger.info("📤 Submitting %d answers to: %s", len(answers), url)
+            return self._post_answers(url, username, code_link, answers)
+        
+        chunks = [answers[i:i + batch_size] for i in range(0, len(answers), batch_size)]
+        logger.info("📤 Submitting %d answers in %d batches to: %s", len(answers), len(chunks), url)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda chunk: self._post_answers(url, username, code_link, chunk), chunks
+            ))
+        
+        combined = {"batches": results}
+        errors = [result["error"] for result in results if "error" in result]
+        if errors:
+            combined["error"] = "; ".join(errors)
+        return combined
+    
+    def _post_answers(self, url, username, code_link, answers):
+        """POST one batch of answers and return the server's result"""
         try:
-            url = f"{self.api_url}/submit"
-            print(f"📤 Submitting {len(answers)} answers to: {url}")
-            
             payload = {
                 "username": username,
                 "agent_code": code_link,
                 "answers": answers
             }
             
-            response = requests.post(url, json=payload, timeout=60)
+            response = request_with_backoff(
+                self._session, "POST", url, data=orjson.dumps(payload),
+                headers={**JSON_HEADERS, "Content-Type": "application/json"}, timeout=60
+            )
             response.raise_for_status()
             
-            result = response.json()
-            print(f"[INFO] Submission successful")
+            result = orjson.loads(response.content)
+            logger.info("[INFO] Submission successful")
             return result
             
         except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Error submitting answers: {e}")
+            logger.error("[ERROR] Error submitting answers: %s", e)
             return {"error": str(e)}
         except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            logger.error("[ERROR] Unexpected error: %s", e)
+            return {"error": str(e)}
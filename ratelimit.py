@@ -0,0 +1,138 @@
+"""
+Client-side rate limiting
+
+Token buckets that pace outbound API calls below each provider's quota,
+so concurrent batch runs wait briefly up front instead of hitting 429
+errors and wasting time on retries, plus the backoff policy used when a
+call still fails transiently.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+
+# HTTP statuses worth retrying: timeouts, rate limits and transient server errors
+RECOVERABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def backoff_delay(attempt, retry_after=None, base=1.0, cap=30.0):
+    """
+    Seconds to wait before retrying a failed call
+
+    Uses exponential backoff with full jitter, so concurrent callers that
+    failed together do not all retry at the same moment.
+
+    Args:
+        attempt: Number of failed attempts so far, starting at 0
+        retry_after: Server-provided Retry-After in seconds, honored if given
+        base: Delay scale for the first retry
+        cap: Maximum delay
+
+    Returns:
+        Delay in seconds
+    """
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given in seconds
+
+    Returns:
+        Seconds as a float, or None if missing or given as an HTTP date
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket usable from both threads and coroutines
+
+    Each acquire reserves its tokens immediately (the balance may go
+    negative) and then sleeps until they have been refilled, so callers
+    are released at the configured rate in the order they arrived.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens refilled per second (0 disables limiting)
+            burst: Maximum number of tokens that can build up while idle
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name, default_rate, burst=1):
+        """
+        Create a bucket whose per-second rate comes from an environment variable
+
+        Args:
+            name: Environment variable holding the rate, e.g. "HF_RPS"
+            default_rate: Rate used when the variable is unset or empty
+            burst: Maximum number of tokens that can build up while idle
+
+        Returns:
+            TokenBucket instance
+        """
+        return cls(float(os.environ.get(name, default_rate) or default_rate), burst)
+
+    @classmethod
+    def per_minute_from_env(cls, name, default_per_minute=0):
+        """
+        Create a bucket from a per-minute quota such as tokens per minute
+
+        Args:
+            name: Environment variable holding the quota, e.g. "GROQ_TPM"
+            default_per_minute: Quota used when the variable is unset or empty
+
+        Returns:
+            TokenBucket instance allowing up to one minute's quota at once
+        """
+        per_minute = float(os.environ.get(name, default_per_minute) or default_per_minute)
+        return cls(per_minute / 60, burst=per_minute)
+
+    def _reserve(self, tokens):
+        """Take tokens from the bucket and return the seconds to wait for them"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens=1):
+        """
+        Block the calling thread until tokens are available
+
+        Args:
+            tokens: Number of tokens to take
+        """
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=1):
+        """
+        Wait, without blocking the event loop, until tokens are available
+
+        Args:
+            tokens: Number of tokens to take
+        """
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
@@ -1,6 +1,65 @@
 import os
+import ast
+import hashlib
+import math
+import logging
+import tempfile
+import threading
+import operator
+import orjson
 import requests
-from tavily import TavilyClient
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import cache as answer_cache
+from ratelimit import TokenBucket
+from gaia_client import create_session, request_with_backoff
+
+logger = logging.getLogger(__name__)
+
+# Client-side request pacing for the Tavily search API
+_TAVILY_BUCKET = TokenBucket.from_env("TAVILY_RPS", 2)
+
+# One formatted search result, followed by a separator line
+_SEP = "-" * 50
+_RESULT_TEMPLATE = "Result {i}:\nTitle: {title}\nContent: {content}\nURL: {url}\n" + _SEP + "\n\n"
+
+# Arithmetic operators CalculatorTool evaluates
+_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+# Characters a calculator expression may contain; anything else is
+# rejected up front by a single C-level str.translate pass
+_ALLOWED = frozenset("0123456789+-*/%(). ")
+_DELETE_TABLE = str.maketrans("", "", "".join(_ALLOWED))
+
+# Largest integer result (in bits, about 3000 digits) CalculatorTool will
+# compute, checked before each ** and *, so "9**9**9" cannot hang a worker
+_MAX_RESULT_BITS = 10_000
+
+
+@lru_cache(maxsize=None)
+def _tavily_client(api_key):
+    """One Tavily client per API key, shared by every WebSearchTool"""
+    # Imported here so runs without a Tavily key never load the SDK
+    from tavily import TavilyClient
+    return TavilyClient(api_key=api_key)
+
+
+@lru_cache(maxsize=256)
+def _cached_search(client, query, max_results):
+    """Run a Tavily search; repeated queries are answered from memory"""
+    _TAVILY_BUCKET.acquire()
+    return client.search(query=query, max_results=max_results)
 
 
 class WebSearchTool:
@@ -9,9 +68,9 @@ class WebSearchTool:
     def __init__(self):
         self.api_key = os.environ.get("TAVILY_API_KEY")
         if self.api_key:
-            self.client = TavilyClient(api_key=self.api_key)
+            self.client = _tavily_client(self.api_key)
         else:
-            print("⚠️ Warning: TAVILY_API_KEY not found")
+            logger.warning("⚠️ Warning: TAVILY_API_KEY not found")
             self.client = None
     
     def search(self, query, max_results=8):
@@ -29,40 +88,52 @@ class WebSearchTool:
             return "Web search unavailable - API key not configured"
         
         try:
-            print(f"      Searching for: {query}")
-            response = self.client.search(
-                query=query,
-                max_results=max_results
-            )
+            logger.debug("      Searching for: %s", query)
+            response = _cached_search(self.client, query, max_results)
             
-            # Format results into readable text
-            results_text = f"Search results for '{query}':\n\n"
+            # Format results into readable text, joined once at the end
+            parts = [f"Search results for '{query}':\n\n"]
             
             for i, result in enumerate(response.get('results', []), 1):
-                title = result.get('title', 'No title')
-                content = result.get('content', 'No content')
-                url = result.get('url', 'No URL')
-                
-                results_text += f"Result {i}:\n"
-                results_text += f"Title: {title}\n"
-                results_text += f"Content: {content}\n"
-                results_text += f"URL: {url}\n"
-                results_text += "-" * 50 + "\n\n"
+                parts.append(_RESULT_TEMPLATE.format(
+                    i=i,
+                    title=result.get('title', 'No title'),
+                    content=result.get('content', 'No content'),
+                    url=result.get('url', 'No URL')
+                ))
             
-            return results_text
+            return "".join(parts)
             
         except Exception as e:
             error_msg = f"Search failed: {str(e)}"
-            print(f"      [ERROR] {error_msg}")
+            logger.error("      [ERROR] %s", error_msg)
             return error_msg
 
 
 class FileReaderTool:
     """Tool to read files from GAIA questions"""
     
-    def __init__(self, gaia_api_url):
+    def __init__(self, gaia_api_url, session=None, cache_dir=None, max_bytes=50 * 1024 * 1024, max_cached_files=32):
         self.api_url = gaia_api_url
-        self._file_cache = {}  # Cache downloaded files
+        # Shared session so repeated downloads reuse pooled keep-alive connections
+        self._session = session or create_session()
+        self.max_bytes = max_bytes  # Larger files are skipped
+        # Recently used downloads, least recently used first
+        self.max_cached_files = max_cached_files
+        self._file_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._download_locks = {}  # task_id -> lock held while reading that file
+        # Files never change for a task, so downloads also persist across runs
+        self.cache_dir = cache_dir or os.path.join(answer_cache.cache_dir(), "files")
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def _path(self, task_id):
+        """On-disk cache location of a task's file"""
+        return os.path.join(self.cache_dir, hashlib.sha256(task_id.encode("utf-8")).hexdigest())
+    
+    def close(self):
+        """Close the reader's HTTP session and its pooled connections"""
+        self._session.close()
     
     def read_file(self, task_id, file_name=None):
         """
@@ -76,75 +147,133 @@ class FileReaderTool:
             File content as bytes, or None if download fails
         """
         # Return cached file if available
-        if task_id in self._file_cache:
-            print(f"      ✓ Using cached file for {task_id}")
-            return self._file_cache[task_id]
+        with self._cache_lock:
+            content = self._file_cache.get(task_id)
+            if content is not None:
+                self._file_cache.move_to_end(task_id)
+        if content is not None:
+            logger.debug("      ✓ Using cached file for %s", task_id)
+            return content
+        
+        # One download per task at a time: a concurrent caller (e.g. prefetch)
+        # waits here and then finds the finished file in the cache
+        with self._cache_lock:
+            task_lock = self._download_locks.setdefault(task_id, threading.Lock())
+        with task_lock:
+            return self._read_uncached(task_id, file_name)
+    
+    def _read_uncached(self, task_id, file_name):
+        """Load a file from memory or disk, downloading it on a miss"""
+        with self._cache_lock:
+            content = self._file_cache.get(task_id)
+        if content is not None:
+            return content
+        
+        path = self._path(task_id)
+        if os.path.exists(path):
+            logger.debug("      ✓ Using file cached on disk for %s", task_id)
+            with open(path, "rb") as f:
+                content = f.read()
+            self._remember(task_id, content)
+            return content
         
         # GAIA API uses /files/{task_id} endpoint
         url = f"{self.api_url}/files/{task_id}"
         
         if file_name:
-            print(f"      File name: {file_name}")
+            logger.debug("      File name: %s", file_name)
         
-        # Try downloading with retries
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                print(f"      Downloading from: {url}" + (f" (attempt {attempt + 1})" if attempt > 0 else ""))
-                
-                response = requests.get(url, timeout=60)
-                
-                # Check HTTP status first
-                if response.status_code == 404:
-                    print(f"      ⚠️  File not found (404)")
-                    return None
-                
-                if response.status_code != 200:
-                    print(f"      ⚠️  HTTP {response.status_code}")
-                    if attempt < max_retries - 1:
-                        import time
-                        time.sleep(1)
-                        continue
-                    return None
-                
-                # Check for empty response
-                if len(response.content) == 0:
-                    print(f"      ⚠️  Empty response")
-                    return None
-                
-                # Check if response is JSON error message
-                content_type = response.headers.get('Content-Type', '')
-                if 'application/json' in content_type:
-                    try:
-                        error_data = response.json()
-                        if 'detail' in error_data:
-                            error_msg = error_data['detail']
-                            print(f"      ⚠️  API Error: {error_msg}")
-                            return None
-                    except:
-                        pass
-                
-                # Success - cache and return
-                print(f"      ✓ File downloaded successfully ({len(response.content)} bytes)")
-                self._file_cache[task_id] = response.content
-                return response.content
-                    
-            except requests.exceptions.Timeout:
-                print(f"      ⚠️  Download timed out")
-                if attempt < max_retries - 1:
-                    import time
-                    time.sleep(2)
-                    continue
+        logger.debug("      Downloading from: %s", url)
+        try:
+            response = request_with_backoff(self._session, "GET", url, timeout=60, stream=True)
+        except requests.exceptions.Timeout:
+            logger.warning("      ⚠️  Download timed out: %s", url)
+            return None
+        except Exception as e:
+            logger.error("      ✗ Error downloading %s: %s", url, e)
+            return None
+        
+        with response:
+            # Check HTTP status first
+            if response.status_code == 404:
+                logger.warning("      ⚠️  File not found (404): %s", url)
                 return None
-            except Exception as e:
-                print(f"      ✗ Error: {str(e)}")
-                if attempt < max_retries - 1:
-                    import time
-                    time.sleep(1)
-                    continue
+            
+            if response.status_code != 200:
+                logger.warning("      ⚠️  HTTP %d from %s", response.status_code, url)
+                return None
+            
+            # Refuse oversized files before reading them into memory
+            content_length = response.headers.get('Content-Length')
+            if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+                logger.warning("      ⚠️  File too large (%s bytes): %s", content_length, url)
+                return None
+            
+            try:
+                buffer = bytearray()
+                for chunk in response.iter_content(1 << 16):
+                    buffer.extend(chunk)
+                    if len(buffer) > self.max_bytes:
+                        logger.warning("      ⚠️  File too large (over %d bytes): %s", self.max_bytes, url)
+                        return None
+            except requests.exceptions.RequestException as e:
+                logger.error("      ✗ Error downloading %s: %s", url, e)
                 return None
+            content = bytes(buffer)
+            content_type = response.headers.get('Content-Type', '')
         
-        return None
+        # Check for empty response
+        if len(content) == 0:
+            logger.warning("      ⚠️  Empty response from %s", url)
+            return None
+        
+        # Check if response is JSON error message
+        if 'application/json' in content_type:
+            try:
+                error_data = orjson.loads(content)
+                if 'detail' in error_data:
+                    error_msg = error_data['detail']
+                    logger.warning("      ⚠️  API Error: %s", error_msg)
+                    return None
+            except:
+                pass
+        
+        # Success - cache and return
+        logger.debug("      ✓ File downloaded successfully (%d bytes)", len(content))
+        self._remember(task_id, content)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return content
+    
+    def _remember(self, task_id, content):
+        """Add a file to the in-memory cache, evicting the least recently used"""
+        with self._cache_lock:
+            self._file_cache[task_id] = content
+            self._file_cache.move_to_end(task_id)
+            while len(self._file_cache) > self.max_cached_files:
+                self._file_cache.popitem(last=False)
+    
+    def prefetch(self, items, max_workers=8):
+        """
+        Download several files concurrently into the cache
+        
+        Meant to run in the background while questions are being answered;
+        a read_file call for a file still downloading waits for it instead
+        of downloading it again.
+        
+        Args:
+            items: Iterable of (task_id, file_name) tuples
+            max_workers: Maximum number of simultaneous downloads
+        """
+        items = [(task_id, file_name) for task_id, file_name in items if task_id not in self._file_cache]
+        if not items:
+            return
+        
+        logger.info("[INFO] Prefetching %d files", len(items))
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+            list(pool.map(lambda item: self.read_file(*item), items))
 
 
 class CalculatorTool:
@@ -162,12 +291,45 @@ class CalculatorTool:
         """
         try:
             # Only allow safe characters
-            allowed_chars = set("0123456789+-*/().() ")
-            if not all(c in allowed_chars for c in expression):
+            if expression.translate(_DELETE_TABLE):
                 return "Error: Invalid characters in expression"
             
-            result = eval(expression)
+            result = self._eval_node(self._compile(expression))
             return str(result)
             
         except Exception as e:
-            return f"Calculation error: {str(e)}"
\ No newline at end of file
+            return f"Calculation error: {str(e)}"
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _compile(expression):
+        """Parse an expression once; repeated calculations reuse the tree"""
+        return ast.parse(expression.strip(), mode="eval").body
+    
+    @classmethod
+    def _eval_node(cls, node):
+        """Evaluate a parsed expression, allowing only numbers and arithmetic"""
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPS:
+            left, right = cls._eval_node(node.left), cls._eval_node(node.right)
+            if cls._result_bits(node.op, left, right) > _MAX_RESULT_BITS:
+                raise ValueError("Result too large")
+            return _OPS[type(node.op)](left, right)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _OPS:
+            return _OPS[type(node.op)](cls._eval_node(node.operand))
+        raise ValueError(f"Unsupported expression: {type(node).__name__}")
+    
+    @staticmethod
+    def _result_bits(op, left, right):
+        """Estimate the bit length of an integer ** or * result before computing it"""
+        # Only exact integers grow without bound; floats overflow on their own
+        if not (isinstance(left, int) and isinstance(right, int)):
+            return 0
+        if isinstance(op, ast.Pow):
+            if right <= 0 or abs(left) <= 1:
+                return 0
+            return right * math.log2(abs(left))
+        if isinstance(op, ast.Mult):
+            return left.bit_length() + right.bit_length()
+        return 0